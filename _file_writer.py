@@ -0,0 +1,63 @@
+"""
+_FILE_WRITER.PY - Writes generated project files to disk
+Shared by app.py and the API clients that save projects themselves.
+"""
+
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+_WRITE_FLAGS = os.O_WRONLY | os.O_CREAT | os.O_TRUNC | getattr(os, 'O_BINARY', 0)
+MAX_WORKERS = min(32, (os.cpu_count() or 1) * 4)
+
+
+def write_file(path, content):
+    """Write text as UTF-8 straight to the fd, bypassing buffered text IO"""
+    data = memoryview(content.encode('utf-8'))
+    fd = os.open(path, _WRITE_FLAGS, 0o644)
+    try:
+        while data:
+            data = data[os.write(fd, data):]
+    finally:
+        os.close(fd)
+
+
+def make_dirs(project_path, files):
+    """Create each distinct parent directory once (sorted so parents come first).
+
+    A directory whose parent was just created here can't exist yet, so it gets
+    a single mkdir instead of makedirs' stat-per-component walk.
+    """
+    dirs = {os.path.dirname(os.path.join(project_path, f['path'])) for f in files}
+    dirs.discard(project_path)
+    created = set()
+    for d in sorted(dirs):
+        if os.path.dirname(d) in created:
+            try:
+                os.mkdir(d)
+            except FileExistsError:  # e.g. 'a/..'-style paths from the model
+                pass
+        elif os.path.isdir(d):
+            continue
+        else:
+            os.makedirs(d, exist_ok=True)
+        created.add(d)
+
+
+def write_project_files(project_path, files):
+    """Write a list of {'path', 'content'} dicts under project_path.
+
+    Directories are created up front in one sequential pass, then the writes
+    (independent, and GIL-free inside os.write) run in a thread pool.
+    Returns the relative paths in input order.
+    """
+    if not files:
+        return []
+
+    make_dirs(project_path, files)
+
+    def write_one(file_info):
+        write_file(os.path.join(project_path, file_info['path']), file_info['content'])
+        return file_info['path']
+
+    with ThreadPoolExecutor(max_workers=min(MAX_WORKERS, len(files))) as executor:
+        return list(executor.map(write_one, files))
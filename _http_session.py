@@ -0,0 +1,24 @@
+"""
+_HTTP_SESSION.PY - Keep-alive requests session for the HTTP API clients
+Shared by the Moonshot and OpenRouter clients.
+"""
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+
+def make_session(headers):
+    """Return a session with the given default headers.
+
+    Repeat calls reuse the TLS connection; transient 429/5xx responses are
+    retried with backoff.
+    """
+    session = requests.Session()
+    session.headers.update(headers)
+    retries = Retry(total=3, backoff_factor=0.5,
+                    status_forcelist=[429, 500, 502, 503, 504],
+                    allowed_methods=frozenset({"POST"}),
+                    raise_on_status=False)
+    session.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=8, max_retries=retries))
+    return session
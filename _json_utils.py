@@ -0,0 +1,122 @@
+"""
+_JSON_UTILS.PY - JSON helpers shared by the API clients
+Uses orjson when installed, stdlib json otherwise.
+"""
+
+import json
+import tempfile
+
+try:
+    import orjson
+    HAS_ORJSON = True
+except ImportError:
+    HAS_ORJSON = False
+
+try:
+    import ijson
+    HAS_IJSON = True
+except ImportError:
+    HAS_IJSON = False
+
+SPOOL_MAX_SIZE = 1 << 20  # Responses larger than this spill to a temp file
+CHUNK_SIZE = 65536
+
+
+if HAS_ORJSON:
+    def loads(data):
+        """Parse JSON from str or bytes (bytes skip a UTF-8 decode)"""
+        return orjson.loads(data)
+    
+    def dumps_bytes(obj) -> bytes:
+        """Serialize to indented UTF-8 JSON bytes"""
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS)
+else:
+    def loads(data):
+        """Parse JSON from str or bytes"""
+        return json.loads(data)
+    
+    def dumps_bytes(obj) -> bytes:
+        """Serialize to indented UTF-8 JSON bytes"""
+        return json.dumps(obj, indent=2, ensure_ascii=False).encode('utf-8')
+
+
+def dumps(obj) -> str:
+    """Serialize to an indented JSON string"""
+    return dumps_bytes(obj).decode('utf-8')
+
+
+def extract_json_object(text):
+    """Return the first balanced {...} object in text (single pass), or None"""
+    start = text.find('{')
+    if start < 0:
+        return None
+    
+    depth = 0
+    in_string = False
+    escaped = False
+    for i in range(start, len(text)):
+        c = text[i]
+        if in_string:
+            if escaped:
+                escaped = False
+            elif c == '\\':
+                escaped = True
+            elif c == '"':
+                in_string = False
+        elif c == '"':
+            in_string = True
+        elif c == '{':
+            depth += 1
+        elif c == '}':
+            depth -= 1
+            if depth == 0:
+                return text[start:i + 1]
+    return None
+
+
+def load_json_object(text):
+    """Find and parse the JSON object embedded in model output.
+    
+    Returns (json_text, data), or (None, None) if there is no object at all.
+    Raises JSONDecodeError if an object was found but doesn't parse.
+    """
+    start = text.find('{')
+    if start < 0:
+        return None, None
+    
+    # Common case: the object runs from the first '{' to the last '}', so a
+    # single C-speed parse settles it
+    candidate = text[start:text.rfind('}') + 1]
+    try:
+        return candidate, loads(candidate)
+    except json.JSONDecodeError:
+        pass
+    
+    # Braces in surrounding prose: fall back to the balanced scan
+    candidate = extract_json_object(text)
+    if candidate is None:
+        return None, None
+    return candidate, loads(candidate)
+
+
+def load_completion(response, max_size=SPOOL_MAX_SIZE):
+    """Parse a chat-completion body from a requests response opened with stream=True.
+    
+    The body is spooled to memory or disk in chunks. Small bodies are parsed
+    whole; large ones (with ijson installed) only have the message content and
+    usage pulled out, so the full envelope is never held in memory.
+    """
+    with tempfile.SpooledTemporaryFile(max_size=max_size) as spool:
+        size = 0
+        for chunk in response.iter_content(chunk_size=CHUNK_SIZE):
+            spool.write(chunk)
+            size += len(chunk)
+        spool.seek(0)
+        
+        if size <= max_size or not HAS_IJSON:
+            return loads(spool.read())
+        
+        content = ''.join(ijson.items(spool, 'choices.item.message.content'))
+        spool.seek(0)
+        usage = next(ijson.items(spool, 'usage', use_float=True), {})
+        return {'choices': [{'message': {'content': content}}], 'usage': usage}
@@ -0,0 +1,47 @@
+"""
+_TOKENIZER.PY - Shared tiktoken encoding for token estimates
+BPE tables are loaded once per process and shared by every client.
+"""
+
+import time
+from functools import lru_cache
+
+try:
+    import tiktoken
+    HAS_TIKTOKEN = True
+except ImportError:
+    HAS_TIKTOKEN = False
+    print("Warning: tiktoken not installed. Token estimation will be approximate.")
+
+# Seconds to wait before retrying an encoding that failed to load
+RETRY_DELAY = 60.0
+
+_failed_at = {}
+
+
+@lru_cache(maxsize=4)
+def _load_encoding(name):
+    """Load an encoding; raises on failure, so only successful loads are cached"""
+    return tiktoken.get_encoding(name)
+
+
+def get_encoding(name="cl100k_base"):
+    """Return a tiktoken encoding, loaded once per process (None if unavailable).
+
+    tiktoken downloads the BPE tables on first use, so a failed load (e.g. a
+    network hiccup) is retried after RETRY_DELAY instead of sticking.
+    """
+    if not HAS_TIKTOKEN:
+        return None
+    failed_at = _failed_at.get(name)
+    if failed_at is not None and time.monotonic() - failed_at < RETRY_DELAY:
+        return None
+    try:
+        encoding = _load_encoding(name)
+    except Exception as e:
+        _failed_at[name] = time.monotonic()
+        print(f"Warning: could not load tiktoken encoding {name} ({e}). "
+              f"Token estimation will be approximate; retrying in {RETRY_DELAY:.0f}s.")
+        return None
+    _failed_at.pop(name, None)
+    return encoding
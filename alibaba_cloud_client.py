@@ -0,0 +1,429 @@
+"""
+ALIBABA_CLOUD_CLIENT.PY - Direct Alibaba Cloud Model Studio API Client
+Created: 23/7/2025
+"""
+
+import asyncio
+import time
+import httpx
+from openai import OpenAI, AsyncOpenAI, APIStatusError
+import os
+import threading
+from collections import OrderedDict
+from hashlib import blake2b
+from types import MappingProxyType
+from typing import Tuple, Optional, Dict, Any, Iterator
+
+from _tokenizer import get_encoding
+
+BASE_URL = "https://dashscope-intl.aliyuncs.com"
+COMPATIBLE_MODE_PATH = "/compatible-mode/v1"
+REQUEST_TIMEOUT = httpx.Timeout(120.0, connect=5.0)
+
+# Shared async HTTP pool (HTTP/2) used by every AsyncOpenAI instance
+_async_http_client: Optional[httpx.AsyncClient] = None
+
+
+def _get_async_http_client() -> httpx.AsyncClient:
+    """Return the process-wide async HTTP client"""
+    global _async_http_client
+    if _async_http_client is None:
+        _async_http_client = httpx.AsyncClient(
+            http2=True,
+            limits=httpx.Limits(max_connections=64),
+            timeout=REQUEST_TIMEOUT
+        )
+    return _async_http_client
+
+
+# Concurrency and rate limits for async requests
+QWEN_MAX_ASYNC = int(os.getenv("QWEN_MAX_ASYNC", "8"))
+QWEN_RPM = int(os.getenv("QWEN_RPM", "500"))
+MAX_RETRIES = 2  # SDK retries 429/5xx/connection errors with backoff (3 attempts total)
+TOKEN_CACHE_SIZE = 256
+
+_llm_semaphore = asyncio.Semaphore(QWEN_MAX_ASYNC)
+
+
+class TokenBucket:
+    """Async limiter for requests-per-minute and tokens-per-minute"""
+    
+    def __init__(self, rpm: int, tpm: int):
+        self.rpm = rpm
+        self.tpm = tpm
+        self._requests = float(rpm)
+        self._tokens = float(tpm)
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+    
+    def _refill(self):
+        now = time.monotonic()
+        elapsed = now - self._updated
+        self._updated = now
+        self._requests = min(self.rpm, self._requests + elapsed * self.rpm / 60)
+        self._tokens = min(self.tpm, self._tokens + elapsed * self.tpm / 60)
+    
+    async def acquire(self, tokens: int):
+        """Wait until one request and `tokens` tokens are available"""
+        tokens = min(tokens, self.tpm)
+        async with self._lock:
+            while True:
+                self._refill()
+                if self._requests >= 1 and self._tokens >= tokens:
+                    self._requests -= 1
+                    self._tokens -= tokens
+                    return
+                wait = max((1 - self._requests) * 60 / self.rpm,
+                           (tokens - self._tokens) * 60 / self.tpm)
+                await asyncio.sleep(wait)
+
+
+# One bucket per (API key, model) - Dashscope limits are per key and model.
+# Keyed by a digest of the key, as app.py's client cache is, so raw keys aren't kept
+_buckets: Dict[Tuple[str, str], TokenBucket] = {}
+
+
+def _get_bucket(api_key: str, model_config: Dict[str, Any]) -> TokenBucket:
+    """Return the rate limiter for this key and model"""
+    key = (blake2b(api_key.encode("utf-8"), digest_size=16).hexdigest(), model_config["model_id"])
+    bucket = _buckets.get(key)
+    if bucket is None:
+        bucket = _buckets[key] = TokenBucket(rpm=QWEN_RPM, tpm=model_config["max_tokens"] * 8)
+    return bucket
+
+
+class AlibabCloudClient:
+    """Client for direct Alibaba Cloud Model Studio API access"""
+    
+    # Model configurations (shared, read-only)
+    MODELS = MappingProxyType({
+        "qwen-max": {
+            "name": "Qwen-Max",
+            "model_id": "qwen-max-2025-01-25",
+            "max_tokens": 32768,
+            "supports_thinking": False
+        },
+        "qwen-plus": {
+            "name": "Qwen-Plus",
+            "model_id": "qwen-plus-2025-04-28",
+            "max_tokens": 131072,
+            "supports_thinking": True
+        },
+        "qwen-turbo": {
+            "name": "Qwen-Turbo",
+            "model_id": "qwen-turbo-2025-04-28",
+            "max_tokens": 131072,
+            "supports_thinking": True
+        },
+        # Add new models here:
+        "qwen3-coder-480b-a35b-instruct": {
+            "name": "Qwen3-Coder-480B",
+            "model_id": "qwen3-coder-480b-a35b-instruct",
+            "max_tokens": 131072,
+            "supports_thinking": True
+        },
+        "qwen3-turbo": {
+            "name": "Qwen3-Turbo",
+            "model_id": "qwen3-turbo",
+            "max_tokens": 131072,
+            "supports_thinking": True
+        },
+        "qwen-long": {
+            "name": "Qwen-Long",
+            "model_id": "qwen-long",
+            "max_tokens": 1000000,
+            "supports_thinking": False
+        }
+    })
+    
+    def __init__(self, api_key: str):
+        self.api_key = api_key
+        self.base_url = f"{BASE_URL}{COMPATIBLE_MODE_PATH}"
+        
+        # OpenAI-compatible SDK clients (pooling, retries and streaming built in)
+        self.client = OpenAI(api_key=api_key, base_url=self.base_url,
+                             timeout=REQUEST_TIMEOUT, max_retries=MAX_RETRIES)
+        self.aclient = AsyncOpenAI(api_key=api_key, base_url=self.base_url,
+                                   timeout=REQUEST_TIMEOUT, max_retries=MAX_RETRIES,
+                                   http_client=_get_async_http_client())
+        
+        # Default model
+        self.model = "qwen-plus"
+        self.temperature = 0.6
+        self.enable_thinking = False
+        
+        # Token counts keyed by content hash (the UI re-estimates on every edit)
+        self._tok_cache: "OrderedDict[bytes, int]" = OrderedDict()
+        self._tok_cache_lock = threading.Lock()
+    
+    @property
+    def tokenizer(self):
+        """Shared tokenizer (BPE tables are loaded once per process; None until they load)"""
+        return get_encoding()
+    
+    @property
+    def max_context(self) -> int:
+        """Context window of the active model"""
+        return self.MODELS.get(self.model, self.MODELS["qwen-plus"])["max_tokens"]
+    
+    def estimate_tokens(self, text: str) -> int:
+        """Estimate token count for text"""
+        key = blake2b(text.encode("utf-8", "ignore"), digest_size=16).digest()
+        with self._tok_cache_lock:
+            if key in self._tok_cache:
+                self._tok_cache.move_to_end(key)
+                return self._tok_cache[key]
+        
+        # encode_ordinary skips the special-token scan; we only need a count
+        tokenizer = self.tokenizer
+        if not tokenizer:
+            return len(text) // 4  # Approximate; not cached so a later load is used
+        count = len(tokenizer.encode_ordinary(text))
+        
+        with self._tok_cache_lock:
+            self._tok_cache[key] = count
+            if len(self._tok_cache) > TOKEN_CACHE_SIZE:
+                self._tok_cache.popitem(last=False)
+        return count
+    
+    def estimate_tokens_batch(self, texts: list) -> int:
+        """Estimate total token count for several texts (encoded in parallel)"""
+        tokenizer = self.tokenizer
+        if not tokenizer:
+            return sum(len(text) for text in texts) // 4
+        return sum(len(ids) for ids in tokenizer.encode_ordinary_batch(texts, num_threads=4))
+    
+    def set_model(self, model_key: str):
+        """Set the active model"""
+        if model_key in self.MODELS:
+            self.model = model_key
+            print(f"Model set to: {self.MODELS[model_key]['name']}")
+        else:
+            print(f"Unknown model: {model_key}")
+    
+    def _build_payload(self, messages: list, max_tokens: int,
+                       enable_thinking: Optional[bool]) -> Tuple[Dict[str, Any], Dict[str, Any], bool]:
+        """Build chat.completions.create() arguments for the active model"""
+        
+        model_config = self.MODELS.get(self.model, self.MODELS["qwen-plus"])
+        model_id = model_config["model_id"]
+        
+        # Use model's thinking capability if supported
+        use_thinking = enable_thinking if enable_thinking is not None else self.enable_thinking
+        if use_thinking and not model_config["supports_thinking"]:
+            print(f"Warning: {model_config['name']} doesn't support thinking mode")
+            use_thinking = False
+        
+        data = {
+            "model": model_id,
+            "messages": messages,
+            "temperature": self.temperature,
+            "max_tokens": min(max_tokens, model_config["max_tokens"])
+        }
+        
+        # Add thinking parameter if supported
+        if use_thinking:
+            # For newer Qwen models, enable_thinking is passed in extra_body.
+            # Dashscope only accepts it on streaming calls, so callers that
+            # want a whole response collect the stream instead
+            data["extra_body"] = {"enable_thinking": True}
+            print("🧠 Thinking mode enabled")
+        
+        return data, model_config, use_thinking
+    
+    @staticmethod
+    def _usage_info(usage, model_id: str, use_thinking: bool) -> Dict[str, Any]:
+        """Convert an SDK usage object into our token_info dict"""
+        # Prompt-cache hits are reported under prompt_tokens_details (None if not reported)
+        details = getattr(usage, 'prompt_tokens_details', None)
+        return {
+            'input_tokens': usage.prompt_tokens if usage else 0,
+            'cached_tokens': getattr(details, 'cached_tokens', None),
+            'output_tokens': usage.completion_tokens if usage else 0,
+            'total_tokens': usage.total_tokens if usage else 0,
+            'model': model_id,
+            'thinking_enabled': use_thinking
+        }
+    
+    def send_completion(self, messages: list, max_tokens: int = 4000, 
+                       enable_thinking: Optional[bool] = None) -> Tuple[Optional[str], Dict[str, Any]]:
+        """Send completion request to Alibaba Cloud"""
+        
+        data, model_config, use_thinking = self._build_payload(messages, max_tokens, enable_thinking)
+        model_id = model_config["model_id"]
+        
+        if use_thinking:
+            # Thinking mode is stream-only on Dashscope; join the deltas
+            token_info: Dict[str, Any] = {}
+            content = ''.join(self.stream_completion(messages, max_tokens, use_thinking, token_info))
+            if 'error' in token_info:
+                return None, {'error': token_info['error']}
+            return content, token_info
+        
+        try:
+            print(f"Sending request to {model_config['name']} ({model_id})...")
+            resp = self.client.chat.completions.create(**data)
+            return resp.choices[0].message.content, self._usage_info(resp.usage, model_id, use_thinking)
+                
+        except APIStatusError as e:
+            print(f"Error: {e.status_code}")
+            print(e.response.text)
+            return None, {'error': e.response.text}
+        except Exception as e:
+            print(f"Exception: {str(e)}")
+            return None, {'error': str(e)}
+    
+    def stream_completion(self, messages: list, max_tokens: int = 4000,
+                          enable_thinking: Optional[bool] = None,
+                          token_info: Optional[Dict[str, Any]] = None) -> Iterator[str]:
+        """Stream completion deltas from Alibaba Cloud as they arrive
+        
+        Usage (or an 'error' entry) is written into token_info once the stream ends.
+        This is the synchronous path (one Flask worker thread per stream), so it
+        is not counted against the async semaphore or token bucket; the SDK's
+        429 retries are its only rate limiting.
+        """
+        if token_info is None:
+            token_info = {}
+        
+        data, model_config, use_thinking = self._build_payload(messages, max_tokens, enable_thinking)
+        model_id = model_config["model_id"]
+        token_info.update(self._usage_info(None, model_id, use_thinking))
+        
+        try:
+            print(f"Streaming request to {model_config['name']} ({model_id})...")
+            stream = self.client.chat.completions.create(
+                **data, stream=True, stream_options={"include_usage": True}
+            )
+            with stream:
+                for chunk in stream:
+                    if chunk.usage:
+                        token_info.update(self._usage_info(chunk.usage, model_id, use_thinking))
+                    for choice in chunk.choices:
+                        if choice.delta.content:
+                            yield choice.delta.content
+                
+        except APIStatusError as e:
+            print(f"Error: {e.status_code}")
+            print(e.response.text)
+            token_info['error'] = e.response.text
+        except Exception as e:
+            print(f"Exception: {str(e)}")
+            token_info['error'] = str(e)
+    
+    async def asend_completion(self, messages: list, max_tokens: int = 4000,
+                               enable_thinking: Optional[bool] = None) -> Tuple[Optional[str], Dict[str, Any]]:
+        """Async variant of send_completion using the shared HTTP/2 pool"""
+        
+        data, model_config, use_thinking = self._build_payload(messages, max_tokens, enable_thinking)
+        model_id = model_config["model_id"]
+        
+        # Budget input plus requested output against the TPM bucket. The BPE
+        # encode is CPU-bound, so run it off the shared event-loop thread
+        input_tokens = await asyncio.to_thread(self.estimate_tokens_batch, [m["content"] for m in messages])
+        estimated_tokens = input_tokens + data["max_tokens"]
+        bucket = _get_bucket(self.api_key, model_config)
+        
+        try:
+            async with _llm_semaphore:
+                await bucket.acquire(estimated_tokens)
+                print(f"Sending async request to {model_config['name']} ({model_id})...")
+                if use_thinking:
+                    return await self._acollect_stream(data, model_id, use_thinking)
+                resp = await self.aclient.chat.completions.create(**data)
+                return resp.choices[0].message.content, self._usage_info(resp.usage, model_id, use_thinking)
+                
+        except APIStatusError as e:
+            print(f"Error: {e.status_code}")
+            print(e.response.text)
+            return None, {'error': e.response.text}
+        except Exception as e:
+            print(f"Exception: {str(e)}")
+            return None, {'error': str(e)}
+    
+    async def _acollect_stream(self, data: Dict[str, Any], model_id: str,
+                               use_thinking: bool) -> Tuple[str, Dict[str, Any]]:
+        """Run a request as a stream and return the joined content and usage"""
+        parts = []
+        usage = None
+        stream = await self.aclient.chat.completions.create(
+            **data, stream=True, stream_options={"include_usage": True}
+        )
+        async with stream:
+            async for chunk in stream:
+                if chunk.usage:
+                    usage = chunk.usage
+                for choice in chunk.choices:
+                    if choice.delta.content:
+                        parts.append(choice.delta.content)
+        return ''.join(parts), self._usage_info(usage, model_id, use_thinking)
+    
+    def _build_prd_messages(self, prd_content: str, project_name: str) -> Tuple[list, bool]:
+        """Build the PRD code-generation messages and thinking flag"""
+        
+        model_config = self.MODELS.get(self.model, self.MODELS["qwen-plus"])
+        
+        # Enhanced system prompt for Alibaba Cloud models
+        system_prompt = f"""You are an expert full-stack developer using {model_config['name']} from Alibaba Cloud.
+Convert the PRD (Product Requirements Document) into a complete, working codebase.
+
+CRITICAL INSTRUCTIONS:
+1. Generate COMPLETE, PRODUCTION-READY code
+2. Create ALL necessary files with FULL implementation
+3. NO placeholders, NO TODOs, NO comments like "implement later"
+4. Include proper error handling and validation
+5. Follow modern best practices and design patterns
+
+Project Structure Requirements:
+- Create a well-organized directory structure
+- Include all configuration files (package.json, requirements.txt, etc.)
+- Add a comprehensive README.md with setup instructions
+- Include example .env files where needed
+
+Output Format:
+For each file, use this EXACT format:
+
+### Path: <relative/path/to/file>
+```<language>
+<complete file content>
+```
+
+Start with the directory structure overview, then generate each file."""
+
+        messages = [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": f"Project Name: {project_name}\n\nPRD Content:\n{prd_content}\n\nGenerate the complete codebase."}
+        ]
+        
+        # Enable thinking mode for complex code generation if supported
+        use_thinking = model_config["supports_thinking"] and self.enable_thinking
+        
+        return messages, use_thinking
+    
+    def send_prd_request(self, prd_content: str, project_name: str, 
+                        output_dir: str, max_tokens: int = 100000) -> Tuple[Optional[str], Dict[str, Any]]:
+        """Send PRD to model for code generation"""
+        
+        messages, use_thinking = self._build_prd_messages(prd_content, project_name)
+        return self.send_completion(messages, max_tokens, use_thinking)
+    
+    def stream_prd_request(self, prd_content: str, project_name: str,
+                           output_dir: str, max_tokens: int = 100000) -> Tuple[Iterator[str], Dict[str, Any]]:
+        """Stream PRD code generation; token_info is filled once the iterator is exhausted"""
+        
+        messages, use_thinking = self._build_prd_messages(prd_content, project_name)
+        token_info: Dict[str, Any] = {}
+        return self.stream_completion(messages, max_tokens, use_thinking, token_info), token_info
+    
+    async def asend_prd_request(self, prd_content: str, project_name: str,
+                                output_dir: str, max_tokens: int = 100000) -> Tuple[Optional[str], Dict[str, Any]]:
+        """Async variant of send_prd_request"""
+        
+        messages, use_thinking = self._build_prd_messages(prd_content, project_name)
+        return await self.asend_completion(messages, max_tokens, use_thinking)
+    
+    def test_connection(self) -> bool:
+        """Test API connection"""
+        messages = [{"role": "user", "content": "Say 'Hello from Alibaba Cloud!'"}]
+        response, _ = self.send_completion(messages, max_tokens=20)
+        return response is not None
@@ -17,10 +17,18 @@ Models:
 - Qwen-Max: 32K context, flagship model (via Alibaba Direct)
 """
 
-from flask import Flask, request, jsonify, send_from_directory
+from flask import Flask, Response, request, jsonify, send_from_directory, stream_with_context
 from flask_cors import CORS
+import io
+import codecs
 import os
+import hashlib
+import re
 import json
+import asyncio
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from openrouter_client import OpenRouterClient
 from moonshot_client import MoonshotClient
 from werkzeug.utils import secure_filename
@@ -33,29 +41,51 @@ from datetime import datetime
 
 # Import our config manager
 from config_manager import config_manager
+from _file_writer import write_file, write_project_files
+from _json_utils import loads, dumps_bytes, load_json_object
 
-# Import Alibaba Cloud client (handling hyphenated filename)
-import importlib.util
-spec = importlib.util.spec_from_file_location("alibaba_cloud_client", "alibaba-cloud-client.py")
-alibaba_module = importlib.util.module_from_spec(spec)
-spec.loader.exec_module(alibaba_module)
-AlibabCloudClient = alibaba_module.AlibabCloudClient
+# Import Alibaba Cloud client
+from alibaba_cloud_client import AlibabCloudClient
+from _tokenizer import get_encoding
+
+# Load tokenizer tables at import so `gunicorn --preload` shares them across workers
+get_encoding()
 
 # Load Alibaba API keys from environment or config file
-ALIBABA_KEYS = []
+ALIBABA_KEYS_FILE = 'config/ALIBABA-KEYS.json'
+_env_alibaba_keys = []
 # Try to load from environment variables
 for i in range(1, 4):
     key = os.getenv(f'ALIBABA_API_KEY_{i}')
     if key:
-        ALIBABA_KEYS.append(key)
+        _env_alibaba_keys.append(key)
+
+_file_alibaba_keys = []
+_file_alibaba_keys_mtime = None
 
-# If no env keys, try config file (but DON'T commit this file!)
-if not ALIBABA_KEYS:
+def load_alibaba_keys():
+    """Return Alibaba API keys, re-reading the config file only when it changes"""
+    global _file_alibaba_keys, _file_alibaba_keys_mtime
+    if _env_alibaba_keys:
+        return _env_alibaba_keys
+    
+    # If no env keys, try config file (but DON'T commit this file!)
     try:
-        with open('config/ALIBABA-KEYS.json', 'r') as f:
-            ALIBABA_KEYS = json.load(f)  # Directly load the array
-    except Exception as e:
-        print(f"WARNING: No Alibaba API keys found. Qwen models won't work. Error: {e}")
+        mtime = os.stat(ALIBABA_KEYS_FILE).st_mtime
+    except FileNotFoundError:
+        return _file_alibaba_keys
+    
+    if mtime != _file_alibaba_keys_mtime:
+        try:
+            with open(ALIBABA_KEYS_FILE, 'rb') as f:
+                _file_alibaba_keys = loads(f.read())  # Directly load the array
+        except Exception as e:
+            print(f"WARNING: Could not read {ALIBABA_KEYS_FILE}: {e}")
+        _file_alibaba_keys_mtime = mtime
+    return _file_alibaba_keys
+
+if not load_alibaba_keys():
+    print("WARNING: No Alibaba API keys found. Qwen models won't work.")
 
 # Load environment variables from .env file
 from dotenv import load_dotenv
@@ -64,6 +94,79 @@ load_dotenv()
 app = Flask(__name__)
 CORS(app)
 
+# Background event loop for async LLM calls (started lazily on first use)
+_async_loop = None
+_async_loop_lock = threading.Lock()
+
+def get_async_loop():
+    """Return the persistent event loop, starting its thread if needed"""
+    global _async_loop
+    with _async_loop_lock:
+        if _async_loop is None:
+            _async_loop = asyncio.new_event_loop()
+            threading.Thread(target=_async_loop.run_forever, name='llm-event-loop', daemon=True).start()
+    return _async_loop
+
+def run_async(coro):
+    """Run a coroutine on the background loop and wait for its result"""
+    return asyncio.run_coroutine_threadsafe(coro, get_async_loop()).result()
+
+# Tokens reserved for the system prompt/template around the PRD
+PROMPT_OVERHEAD_TOKENS = 2000
+
+# Concurrent project saves in multi-project mode (each save also fans out its file writes)
+MAX_SAVE_WORKERS = 8
+
+# Clients keyed by (model, API key hash); reusing them keeps tokenizer,
+# token-count cache and HTTP connection pools warm across requests
+_CLIENT_CACHE = OrderedDict()
+_CLIENT_CACHE_SIZE = 32
+_client_cache_lock = threading.Lock()
+
+def _build_client(model, api_key):
+    """Create and configure a client for the model selection"""
+    if model == 'kimi':
+        print(f"Using Kimi K2 model via Moonshot AI...")
+        return MoonshotClient(api_key)
+    elif model == 'qwen':
+        print(f"Using Qwen-Plus via Alibaba Direct API...")
+        client = AlibabCloudClient(api_key)
+        client.set_model('qwen-plus')
+        client.enable_thinking = True  # Enable thinking mode for code generation
+        return client
+    elif model == 'qwen235':
+        print(f"Using Qwen-Max via Alibaba Direct API...")
+        client = AlibabCloudClient(api_key)
+        client.set_model('qwen-max')
+        return client
+    else:
+        print(f"Using Gemini 2.5 Pro model via OpenRouter...")
+        return OpenRouterClient(api_key)
+
+def get_client(model, api_key):
+    """Return a cached client for (model, api_key), building it on first use
+    
+    Clients are fully configured when built and never mutated afterwards,
+    so concurrent requests can share them safely.
+    """
+    if model not in ('kimi', 'qwen', 'qwen235'):
+        model = 'gemini'
+    key = (model, hashlib.blake2b(api_key.encode('utf-8'), digest_size=16).hexdigest())
+    
+    with _client_cache_lock:
+        client = _CLIENT_CACHE.get(key)
+        if client is not None:
+            _CLIENT_CACHE.move_to_end(key)
+            return client
+    
+    client = _build_client(model, api_key)
+    with _client_cache_lock:
+        client = _CLIENT_CACHE.setdefault(key, client)
+        _CLIENT_CACHE.move_to_end(key)
+        while len(_CLIENT_CACHE) > _CLIENT_CACHE_SIZE:
+            _CLIENT_CACHE.popitem(last=False)
+    return client
+
 # Add request logging
 @app.before_request
 def log_request_info():
@@ -112,8 +215,9 @@ def get_api_keys():
 def save_api_keys():
     """Save API keys to local file storage"""
     data = request.json
-    for key, value in data.items():
-        config_manager.save_api_key(key, value)
+    with config_manager.transaction():
+        for key, value in data.items():
+            config_manager.save_api_key(key, value)
     return jsonify({'success': True})
 
 @app.route('/api/config/settings', methods=['GET'])
@@ -125,8 +229,9 @@ def get_settings():
 def save_settings():
     """Save settings to local file storage"""
     data = request.json
-    for key, value in data.items():
-        config_manager.save_setting(key, value)
+    with config_manager.transaction():
+        for key, value in data.items():
+            config_manager.save_setting(key, value)
     return jsonify({'success': True})
 
 @app.route('/api/config/paths', methods=['GET'])
@@ -154,6 +259,201 @@ def clear_config():
     config_manager.clear_all_data()
     return jsonify({'success': True})
 
+# "# Project: Foo", "# App Name: Foo", ... in PRD content
+_PROJECT_NAME_RE = re.compile(r'#\s*(?:Project|App|Application|System)(?:\s*Name)?:\s*(.+)', re.IGNORECASE)
+
+# Incremental UTF-8 decoder over upload streams. Unlike io.TextIOWrapper it only
+# needs .read(); Werkzeug's SpooledTemporaryFile lacks readable() before Python 3.11
+_utf8_reader = codecs.getreader('utf-8')
+
+_NAME_TRANS = str.maketrans({' ': '_', '-': '_'})
+
+def _sanitize_name(name):
+    """Normalize a project name (spaces and hyphens become underscores)"""
+    return name.translate(_NAME_TRANS)
+
+def _save_generation(response, token_info, *, project_name, output_dir, model, provider,
+                     full_prd_content, estimated_input_tokens):
+    """Parse a model response, write the project files and return (payload, status)"""
+    if not response:
+        return {'error': 'Failed to get response from API'}, 500
+    
+    # Create absolute path for output
+    abs_output_dir = os.path.abspath(output_dir)
+    print(f"DEBUG - Absolute path: '{abs_output_dir}'")
+    
+    # Validate the path
+    if not os.path.exists(abs_output_dir):
+        print(f"DEBUG - Directory doesn't exist, trying to create: '{abs_output_dir}'")
+        # Try to create it
+        try:
+            os.makedirs(abs_output_dir, exist_ok=True)
+            print(f"DEBUG - Successfully created directory: '{abs_output_dir}'")
+        except Exception as e:
+            print(f"DEBUG - Failed to create directory: {str(e)}")
+            return {'error': f'Invalid output directory: {str(e)}'}, 400
+    
+    # Create project directory
+    project_path = os.path.join(abs_output_dir, project_name)
+    
+    # If project already exists, add timestamp
+    if os.path.exists(project_path):
+        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        project_name = f"{project_name}_{timestamp}"
+        project_path = os.path.join(abs_output_dir, project_name)
+    
+    os.makedirs(project_path, exist_ok=True)
+    
+    # Parse JSON response
+    try:
+        # Try to find JSON in response
+        json_text, response_data = load_json_object(response)
+        if json_text is None:
+            return {'error': 'Invalid response format from AI'}, 500
+    except json.JSONDecodeError as e:
+        # Save debug response
+        debug_file = f"debug_response_{project_name}.json"
+        write_file(debug_file, response)
+        return {'error': f'Failed to parse AI response. Debug saved to {debug_file}'}, 500
+    
+    # Create files in project directory
+    files_list = response_data.get('files', [])
+    
+    created_files = write_project_files(project_path, files_list)
+    
+    # Create generation info file (summary sliced once; no copy of the full PRD)
+    prd_summary = full_prd_content[:500]
+    if len(full_prd_content) > 500:
+        prd_summary += '...'
+    
+    generation_info = {
+        'project_name': project_name,
+        'model': model,
+        'provider': 'alibaba_direct' if model in ['qwen', 'qwen235'] else provider,
+        'generation_date': datetime.now().isoformat(),
+        'input_tokens': estimated_input_tokens,
+        'actual_input_tokens': token_info.get('input_tokens', estimated_input_tokens),
+        # None when the provider doesn't report prompt-cache hits (Moonshot, OpenRouter)
+        'cached_tokens': token_info.get('cached_tokens'),
+        'output_tokens': token_info.get('output_tokens', 0),
+        'total_tokens': token_info.get('total_tokens', estimated_input_tokens),
+        'files_created': created_files,
+        'prd_summary': prd_summary
+    }
+    
+    with open(os.path.join(project_path, '_generation_info.json'), 'wb') as f:
+        f.write(dumps_bytes(generation_info))
+    
+    return {
+        'success': True,
+        'projectName': project_name,
+        'outputPath': project_path,
+        'filesCreated': len(created_files),
+        'tokenInfo': {
+            'actual_input': token_info.get('input_tokens', estimated_input_tokens),
+            'cached': token_info.get('cached_tokens'),
+            'output': token_info.get('output_tokens', 0),
+            'total': token_info.get('total_tokens', estimated_input_tokens)
+        }
+    }, 200
+
+def _sse(payload):
+    """Format one server-sent event"""
+    return f"data: {json.dumps(payload)}\n\n"
+
+def _stream_generation(deltas, token_info, save_kwargs):
+    """Relay model deltas as SSE, then save the project and send a final 'done' event"""
+    parts = []
+    try:
+        for delta in deltas:
+            parts.append(delta)
+            yield _sse({'delta': delta})
+        
+        result, status = _save_generation(''.join(parts), token_info, **save_kwargs)
+    except Exception as e:
+        import traceback
+        print(f"Error: {str(e)}")
+        print(traceback.format_exc())
+        result, status = {'error': str(e)}, 500
+    
+    yield _sse({'done': True, 'status': status, **result})
+
+async def _asend_prd_request(client, *args):
+    """Await the client's async PRD call, or run its sync call on a worker thread"""
+    if isinstance(client, AlibabCloudClient):
+        return await client.asend_prd_request(*args)
+    return await asyncio.to_thread(client.send_prd_request, *args)
+
+def _generate_multi_project(client, files, *, model, provider, output_dir, max_tokens):
+    """Generate one project per uploaded PRD file and return (payload, status)"""
+    tasks = []
+    seen_names = set()
+    for file in files:
+        if file and file.filename:
+            content = _utf8_reader(file.stream, errors='replace').read()
+            
+            # Keep project names unique so concurrent saves never share a directory
+            base_name = name = _sanitize_name(os.path.splitext(file.filename)[0])
+            suffix = 2
+            while name in seen_names:
+                name = f"{base_name}_{suffix}"
+                suffix += 1
+            seen_names.add(name)
+            
+            tasks.append((f"=== File: {file.filename} ===\n{content}", name))
+    
+    if not tasks:
+        return {'error': 'No PRD files provided for multi-project generation'}, 400
+    
+    estimates = [client.estimate_tokens(content) for content, _ in tasks]
+    too_large = [name for (_, name), est in zip(tasks, estimates)
+                 if est + PROMPT_OVERHEAD_TOKENS >= client.max_context]
+    if too_large:
+        return {
+            'error': f'PRD too large for this model context ({client.max_context:,} tokens): {", ".join(too_large)}',
+            'budget': client.max_context
+        }, 413
+    
+    async def send_all():
+        return await asyncio.gather(*[
+            _asend_prd_request(client, content, name, output_dir, max_tokens)
+            for content, name in tasks
+        ], return_exceptions=True)
+    
+    print(f"Sending {len(tasks)} PRDs to {model.upper()} model concurrently...")
+    results = run_async(send_all())
+    
+    def save_one(args):
+        (content, name), est, outcome = args
+        # One failed project is reported on its own; the others still count
+        try:
+            if isinstance(outcome, BaseException):
+                raise outcome
+            response, token_info = outcome
+            result, status = _save_generation(
+                response, token_info or {},
+                project_name=name,
+                output_dir=output_dir,
+                model=model,
+                provider=provider,
+                full_prd_content=content,
+                estimated_input_tokens=est
+            )
+        except Exception as e:
+            print(f"Error generating project {name}: {str(e)}")
+            result, status = {'error': str(e)}, 500
+        return {'projectName': name, **result, 'status': status}
+    
+    with ThreadPoolExecutor(max_workers=min(MAX_SAVE_WORKERS, len(tasks))) as executor:
+        projects = list(executor.map(save_one, zip(tasks, estimates, results)))
+    
+    succeeded = sum(1 for p in projects if p['status'] == 200)
+    return {
+        'success': succeeded == len(projects),
+        'projectsCreated': succeeded,
+        'projects': projects
+    }, 200 if succeeded else 500
+
 @app.route('/api/generate', methods=['POST'])
 def generate_code():
     print("DEBUG - /api/generate endpoint hit!", flush=True)
@@ -169,27 +469,30 @@ def generate_code():
         prd_text = request.form.get('prdText', '')
         max_tokens = request.form.get('maxTokens', '100000')
         alibaba_key_index = request.form.get('alibabaKeyIndex', '0')  # New field for manual selection
+        stream = request.form.get('stream', '').lower() in ('1', 'true', 'yes')  # Opt-in SSE output
+        multi_project = request.form.get('multiProject', '').lower() in ('1', 'true', 'yes')  # One project per file
         
         print(f"DEBUG - Received: model={model}, provider={provider}, output_dir={output_dir}", flush=True)
         print(f"DEBUG - API key: {api_key[:10] if api_key else 'None'}...", flush=True)
-        print(f"DEBUG - ALIBABA_KEYS available: {len(ALIBABA_KEYS)}", flush=True)
+        alibaba_keys = load_alibaba_keys()
+        print(f"DEBUG - ALIBABA_KEYS available: {len(alibaba_keys)}", flush=True)
         
         # Check if API key is needed (not needed for Alibaba models)
         if model in ['qwen', 'qwen235']:
             # Use built-in Alibaba keys
-            if not ALIBABA_KEYS:
+            if not alibaba_keys:
                 return jsonify({'error': 'Alibaba API keys not configured in server. Please configure ALIBABA_API_KEY_1 environment variable or create config/ALIBABA-KEYS.json file.'}), 400
             
             # Manual key selection
             try:
                 key_index = int(alibaba_key_index)
-                if 0 <= key_index < len(ALIBABA_KEYS):
-                    api_key = ALIBABA_KEYS[key_index]
+                if 0 <= key_index < len(alibaba_keys):
+                    api_key = alibaba_keys[key_index]
                     print(f"DEBUG - Using Alibaba key index {key_index}", flush=True)
                 else:
-                    return jsonify({'error': f'Invalid key index {key_index}. Available: 0-{len(ALIBABA_KEYS)-1}'}), 400
+                    return jsonify({'error': f'Invalid key index {key_index}. Available: 0-{len(alibaba_keys)-1}'}), 400
             except ValueError:
-                api_key = ALIBABA_KEYS[0]  # Default to first key
+                api_key = alibaba_keys[0]  # Default to first key
                 print(f"DEBUG - Using default Alibaba key (index 0)", flush=True)
         elif not api_key or api_key == 'built-in':
             return jsonify({'error': f'Please provide API key for {model}'}), 400
@@ -223,167 +526,112 @@ def generate_code():
         # Handle file uploads
         files = request.files.getlist('prdFiles')
         
-        # Combine PRD content from files and text
-        combined_content = []
+        # Independent PRD files -> separate projects, generated concurrently
+        if multi_project:
+            result, status = _generate_multi_project(
+                get_client(model, api_key), files,
+                model=model,
+                provider=provider,
+                output_dir=output_dir,
+                max_tokens=max_tokens
+            )
+            return jsonify(result), status
+        
+        # Combine PRD content from files and text into a single buffer
+        prd_buffer = io.StringIO()
         project_name = None
         
-        # Add uploaded files content and try to extract project name
+        # Stream-decode uploaded files and try to extract project name
         for file in files:
             if file and file.filename:
-                content = file.read().decode('utf-8')
-                combined_content.append(f"=== File: {file.filename} ===\n{content}")
+                if prd_buffer.tell():
+                    prd_buffer.write("\n\n")
+                prd_buffer.write(f"=== File: {file.filename} ===\n")
+                shutil.copyfileobj(_utf8_reader(file.stream, errors='replace'), prd_buffer)
                 
                 # Try to extract project name from first file name if not set
                 if not project_name:
-                    project_name = os.path.splitext(file.filename)[0]
-                    # Clean up the project name
-                    project_name = project_name.replace(' ', '_').replace('-', '_')
+                    project_name = _sanitize_name(os.path.splitext(file.filename)[0])
         
         # Add pasted text if no files
-        if not combined_content and prd_text:
-            combined_content.append(prd_text)
+        if not prd_buffer.tell() and prd_text:
+            prd_buffer.write(prd_text)
         
-        if not combined_content:
+        if not prd_buffer.tell():
             return jsonify({'error': 'No PRD content provided'}), 400
         
-        # Combine all content
-        full_prd_content = "\n\n".join(combined_content)
+        full_prd_content = prd_buffer.getvalue()
+        prd_buffer.close()
         
         # If still no project name, try to extract from content or use default
         if not project_name:
             # Try to find project name in content (look for # Project: or similar)
-            import re
-            name_match = re.search(r'#\s*(?:Project|App|Application|System)(?:\s*Name)?:\s*(.+)', full_prd_content, re.IGNORECASE)
+            name_match = _PROJECT_NAME_RE.search(full_prd_content)
             if name_match:
-                project_name = name_match.group(1).strip()
-                project_name = project_name.replace(' ', '_').replace('-', '_')
+                project_name = _sanitize_name(name_match.group(1).strip())
             else:
                 # Use timestamp as default
                 project_name = f"generated_project_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
         
-        # Initialize appropriate client based on model selection
-        if model == 'kimi':
-            print(f"Using Kimi K2 model via Moonshot AI...")
-            client = MoonshotClient(api_key)
-        elif model == 'qwen':
-            print(f"Using Qwen-Plus via Alibaba Direct API...")
-            client = AlibabCloudClient(api_key)
-            client.set_model('qwen-plus')
-            client.enable_thinking = True  # Enable thinking mode for code generation
-        elif model == 'qwen235':
-            print(f"Using Qwen-Max via Alibaba Direct API...")
-            client = AlibabCloudClient(api_key)
-            client.set_model('qwen-max')
-        else:
-            print(f"Using Gemini 2.5 Pro model via OpenRouter...")
-            client = OpenRouterClient(api_key)
+        # Get (cached) client for the model selection
+        client = get_client(model, api_key)
         
         # Estimate tokens
         estimated_input_tokens = client.estimate_tokens(full_prd_content)
         
+        # Reject PRDs that cannot fit the model context before paying for a round-trip
+        estimated_prompt_tokens = estimated_input_tokens + PROMPT_OVERHEAD_TOKENS
+        if estimated_prompt_tokens >= client.max_context:
+            return jsonify({
+                'error': f'PRD is too large for this model: ~{estimated_prompt_tokens:,} input tokens '
+                         f'vs a {client.max_context:,} token context. Split or trim the PRD, '
+                         f'or choose a model with a larger context.',
+                'estimated_input': estimated_prompt_tokens,
+                'budget': client.max_context
+            }), 413
+        
         # Send request to selected AI model
         print(f"Sending request to {model.upper()} model...")
         print(f"DEBUG - About to send request with output_dir: '{output_dir}'")
-        response, token_info = client.send_prd_request(
-            full_prd_content, 
-            project_name, 
-            output_dir,
-            max_tokens
+        save_kwargs = dict(
+            project_name=project_name,
+            output_dir=output_dir,
+            model=model,
+            provider=provider,
+            full_prd_content=full_prd_content,
+            estimated_input_tokens=estimated_input_tokens
         )
         
-        print(f"DEBUG - Got response: {bool(response)}")
-        
-        if not response:
-            return jsonify({'error': 'Failed to get response from API'}), 500
-        
-        # Create absolute path for output
-        abs_output_dir = os.path.abspath(output_dir)
-        print(f"DEBUG - Absolute path: '{abs_output_dir}'")
-        
-        # Validate the path
-        if not os.path.exists(abs_output_dir):
-            print(f"DEBUG - Directory doesn't exist, trying to create: '{abs_output_dir}'")
-            # Try to create it
-            try:
-                os.makedirs(abs_output_dir, exist_ok=True)
-                print(f"DEBUG - Successfully created directory: '{abs_output_dir}'")
-            except Exception as e:
-                print(f"DEBUG - Failed to create directory: {str(e)}")
-                return jsonify({'error': f'Invalid output directory: {str(e)}'}), 400
-        
-        # Create project directory
-        project_path = os.path.join(abs_output_dir, project_name)
-        
-        # If project already exists, add timestamp
-        if os.path.exists(project_path):
-            timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-            project_name = f"{project_name}_{timestamp}"
-            project_path = os.path.join(abs_output_dir, project_name)
-        
-        os.makedirs(project_path, exist_ok=True)
-        
-        # Parse JSON response
-        try:
-            # Try to find JSON in response
-            import re
-            json_match = re.search(r'\{[\s\S]*\}', response)
-            if json_match:
-                response_data = json.loads(json_match.group())
-            else:
-                return jsonify({'error': 'Invalid response format from AI'}), 500
-        except json.JSONDecodeError as e:
-            # Save debug response
-            debug_file = f"debug_response_{project_name}.json"
-            with open(debug_file, 'w', encoding='utf-8') as f:
-                f.write(response)
-            return jsonify({'error': f'Failed to parse AI response. Debug saved to {debug_file}'}), 500
-        
-        # Create files in project directory
-        created_files = []
-        for file_info in response_data.get('files', []):
-            file_path = file_info['path']
-            file_content = file_info['content']
-            
-            # Create full path
-            full_path = os.path.join(project_path, file_path)
-            
-            # Create directory if needed
-            os.makedirs(os.path.dirname(full_path), exist_ok=True)
-            
-            # Write file
-            with open(full_path, 'w', encoding='utf-8') as f:
-                f.write(file_content)
-            
-            created_files.append(file_path)
-        
-        # Create generation info file
-        generation_info = {
-            'project_name': project_name,
-            'model': model,
-            'provider': 'alibaba_direct' if model in ['qwen', 'qwen235'] else provider,
-            'generation_date': datetime.now().isoformat(),
-            'input_tokens': estimated_input_tokens,
-            'actual_input_tokens': token_info.get('input_tokens', estimated_input_tokens),
-            'output_tokens': token_info.get('output_tokens', 0),
-            'total_tokens': token_info.get('total_tokens', estimated_input_tokens),
-            'files_created': created_files,
-            'prd_summary': full_prd_content[:500] + '...' if len(full_prd_content) > 500 else full_prd_content
-        }
+        if stream and isinstance(client, AlibabCloudClient):
+            deltas, token_info = client.stream_prd_request(
+                full_prd_content,
+                project_name,
+                output_dir,
+                max_tokens
+            )
+            return Response(stream_with_context(_stream_generation(deltas, token_info, save_kwargs)),
+                            mimetype='text/event-stream')
+        
+        if isinstance(client, AlibabCloudClient):
+            # Alibaba calls run on the shared async HTTP/2 pool
+            response, token_info = run_async(client.asend_prd_request(
+                full_prd_content,
+                project_name,
+                output_dir,
+                max_tokens
+            ))
+        else:
+            response, token_info = client.send_prd_request(
+                full_prd_content, 
+                project_name, 
+                output_dir,
+                max_tokens
+            )
         
-        with open(os.path.join(project_path, '_generation_info.json'), 'w', encoding='utf-8') as f:
-            json.dump(generation_info, f, indent=2)
+        print(f"DEBUG - Got response: {bool(response)}")
         
-        return jsonify({
-            'success': True,
-            'projectName': project_name,
-            'outputPath': project_path,
-            'filesCreated': len(created_files),
-            'tokenInfo': {
-                'actual_input': token_info.get('input_tokens', estimated_input_tokens),
-                'output': token_info.get('output_tokens', 0),
-                'total': token_info.get('total_tokens', estimated_input_tokens)
-            }
-        })
+        result, status = _save_generation(response, token_info, **save_kwargs)
+        return jsonify(result), status
         
     except Exception as e:
         import traceback
@@ -400,15 +648,7 @@ def estimate_tokens():
         model = data.get('model', 'gemini')
         
         # Initialize appropriate client just for token estimation
-        if model == 'kimi':
-            from moonshot_client import MoonshotClient
-            client = MoonshotClient("dummy_key")  # Just for estimation
-        elif model in ['qwen', 'qwen235']:
-            # Use Alibaba client for estimation
-            client = AlibabCloudClient("dummy_key")
-        else:
-            from openrouter_client import OpenRouterClient
-            client = OpenRouterClient("dummy_key")  # Just for estimation
+        client = get_client(model, "dummy_key")  # Just for estimation
         
         estimated_tokens = client.estimate_tokens(content)
         
@@ -453,6 +693,10 @@ if __name__ == '__main__':
     print("- Qwen-Plus (via Alibaba Direct API) 🚀")
     print("- Qwen-Max (via Alibaba Direct API) 🚀")
     
-    # SECURITY: Set debug=False for production!
-    is_production = os.getenv('FLASK_ENV') == 'production'
-    app.run(debug=True, port=5000)  # Force debug=True for troubleshooting
\ No newline at end of file
+    # SECURITY: the debug server is only for local troubleshooting
+    if os.getenv('FLASK_ENV') == 'development':
+        app.run(debug=True, port=5000)
+    else:
+        # Multi-threaded WSGI server (works on Windows); see Procfile for gunicorn
+        from waitress import serve
+        serve(app, host='127.0.0.1', port=5000, threads=32)
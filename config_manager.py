@@ -1,9 +1,16 @@
 import json
 import os
+import atexit
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
 from pathlib import Path
-from typing import Dict, Any, Optional, List
+from typing import Dict, Any, Optional, List, Set, Tuple
 import logging
 
+# Seconds of inactivity before pending config changes are written
+FLUSH_DELAY = 0.5
+
 class ConfigManager:
     """Manages all configuration settings in local files instead of browser storage"""
     
@@ -16,9 +23,27 @@ class ConfigManager:
         self.settings_file = self.config_dir / "SETTINGS.json"
         self.path_history_file = self.config_dir / "path-history.json"
         
+        # Files people may edit by hand stay indented; the rest are written compact
+        self._indent = {self.api_keys_file: 2, self.settings_file: 2}
+        
         # Initialize files if they don't exist
         self._initialize_files()
         
+        # Parsed file contents; setters update these and mark them dirty. Each
+        # entry remembers the file's (mtime, size) so changes made by another
+        # process (e.g. a second gunicorn worker) are picked up before use
+        self._cache: Dict[Path, Dict[str, Any]] = {}
+        self._stamps: Dict[Path, Tuple[int, int]] = {}
+        self._load_all()
+        
+        # Coalesced writes: dirty files are flushed after FLUSH_DELAY of idle,
+        # at the end of a transaction, or at interpreter exit
+        self._dirty: Set[Path] = set()
+        self._batch_depth = 0
+        self._flush_timer: Optional[threading.Timer] = None
+        self._lock = threading.RLock()
+        atexit.register(self.flush)
+        
     def _initialize_files(self):
         """Create config files if they don't exist"""
         default_api_keys = {
@@ -40,14 +65,48 @@ class ConfigManager:
         
         # Create files with defaults if they don't exist
         if not self.api_keys_file.exists():
-            self._save_json(self.api_keys_file, default_api_keys)
+            self._save_json(self.api_keys_file, default_api_keys, indent=2)
             
         if not self.settings_file.exists():
-            self._save_json(self.settings_file, default_settings)
+            self._save_json(self.settings_file, default_settings, indent=2)
             
         if not self.path_history_file.exists():
             self._save_json(self.path_history_file, default_paths)
     
+    def _load_all(self):
+        """(Re)load every config file into the in-memory cache"""
+        for filepath in (self.api_keys_file, self.settings_file, self.path_history_file):
+            self._load_file(filepath)
+    
+    def _load_file(self, filepath: Path):
+        """Load one config file into the cache and remember its stamp"""
+        self._stamps[filepath] = self._stamp(filepath)
+        self._cache[filepath] = self._load_json(filepath)
+        
+        if filepath == self.path_history_file:
+            # Recent paths as an ordered set, oldest first (the file stores newest first)
+            self._recent_paths: "OrderedDict[str, None]" = OrderedDict(
+                (path, None) for path in reversed(self._cache[filepath].get("recent_paths", []))
+            )
+    
+    @staticmethod
+    def _stamp(filepath: Path) -> Optional[Tuple[int, int]]:
+        """(mtime_ns, size) of a file, or None if it can't be stat'ed"""
+        try:
+            st = os.stat(filepath)
+        except OSError:
+            return None
+        return st.st_mtime_ns, st.st_size
+    
+    def _refresh(self, filepath: Path):
+        """Reload a cached file if another process rewrote it since we last read or wrote it"""
+        with self._lock:
+            # Our own unflushed changes win until they are written
+            if filepath in self._dirty:
+                return
+            if self._stamp(filepath) != self._stamps.get(filepath):
+                self._load_file(filepath)
+    
     def _load_json(self, filepath: Path) -> Dict[str, Any]:
         """Load JSON data from file"""
         try:
@@ -57,87 +116,140 @@ class ConfigManager:
             logging.error(f"Error loading {filepath}: {e}")
             return {}
     
-    def _save_json(self, filepath: Path, data: Dict[str, Any]):
-        """Save JSON data to file"""
+    def _save_json(self, filepath: Path, data: Dict[str, Any], indent: Optional[int] = None):
+        """Save JSON data to file atomically (temp file + os.replace)"""
+        tmp_path = filepath.with_suffix('.tmp')
         try:
-            with open(filepath, 'w', encoding='utf-8') as f:
-                json.dump(data, f, indent=2, ensure_ascii=False)
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(data, f, indent=indent, ensure_ascii=False)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, filepath)
         except Exception as e:
             logging.error(f"Error saving {filepath}: {e}")
     
+    def _mark_dirty(self, filepath: Path):
+        """Schedule a (debounced) write of a cached config file"""
+        with self._lock:
+            self._dirty.add(filepath)
+            if self._batch_depth:
+                return
+            if self._flush_timer:
+                self._flush_timer.cancel()
+            self._flush_timer = threading.Timer(FLUSH_DELAY, self.flush)
+            self._flush_timer.daemon = True
+            self._flush_timer.start()
+    
+    def flush(self):
+        """Write every dirty config file now"""
+        with self._lock:
+            if self._flush_timer:
+                self._flush_timer.cancel()
+                self._flush_timer = None
+            dirty, self._dirty = self._dirty, set()
+            for filepath in dirty:
+                data = self._cache[filepath]
+                if filepath == self.path_history_file:
+                    data["recent_paths"] = list(reversed(self._recent_paths))
+                self._save_json(filepath, data, indent=self._indent.get(filepath))
+                self._stamps[filepath] = self._stamp(filepath)
+    
+    def begin_transaction(self):
+        """Hold writes until the matching commit()"""
+        with self._lock:
+            self._batch_depth += 1
+    
+    def commit(self):
+        """End a transaction; the outermost commit writes each dirty file once"""
+        with self._lock:
+            self._batch_depth = max(0, self._batch_depth - 1)
+            if not self._batch_depth:
+                self.flush()
+    
+    @contextmanager
+    def transaction(self):
+        """Context manager around begin_transaction()/commit()"""
+        self.begin_transaction()
+        try:
+            yield self
+        finally:
+            self.commit()
+    
     # API Keys Management
     def get_api_keys(self) -> Dict[str, str]:
         """Get all API keys"""
-        return self._load_json(self.api_keys_file)
+        self._refresh(self.api_keys_file)
+        return dict(self._cache[self.api_keys_file])
     
     def save_api_key(self, key_name: str, key_value: str):
         """Save a single API key"""
-        keys = self.get_api_keys()
-        keys[key_name] = key_value
-        self._save_json(self.api_keys_file, keys)
+        with self._lock:
+            self._refresh(self.api_keys_file)
+            self._cache[self.api_keys_file][key_name] = key_value
+            self._mark_dirty(self.api_keys_file)
     
     def get_api_key(self, key_name: str) -> Optional[str]:
         """Get a specific API key"""
-        keys = self.get_api_keys()
-        return keys.get(key_name)
+        self._refresh(self.api_keys_file)
+        return self._cache[self.api_keys_file].get(key_name)
     
     # Settings Management
     def get_settings(self) -> Dict[str, Any]:
         """Get all settings"""
-        return self._load_json(self.settings_file)
+        self._refresh(self.settings_file)
+        return dict(self._cache[self.settings_file])
     
     def save_setting(self, setting_name: str, value: Any):
         """Save a single setting"""
-        settings = self.get_settings()
-        settings[setting_name] = value
-        self._save_json(self.settings_file, settings)
+        with self._lock:
+            self._refresh(self.settings_file)
+            self._cache[self.settings_file][setting_name] = value
+            self._mark_dirty(self.settings_file)
     
     def get_setting(self, setting_name: str) -> Optional[Any]:
         """Get a specific setting"""
-        settings = self.get_settings()
-        return settings.get(setting_name)
+        self._refresh(self.settings_file)
+        return self._cache[self.settings_file].get(setting_name)
     
     # Path History Management
     def get_path_history(self) -> List[str]:
         """Get recent paths"""
-        data = self._load_json(self.path_history_file)
-        return data.get("recent_paths", [])
+        self._refresh(self.path_history_file)
+        return list(reversed(self._recent_paths))
     
     def add_path_to_history(self, path: str):
         """Add a path to history"""
         if not path or path == "output":
             return
             
-        data = self._load_json(self.path_history_file)
-        paths = data.get("recent_paths", [])
-        max_paths = data.get("max_paths", 20)
-        
-        # Remove if already exists
-        if path in paths:
-            paths.remove(path)
-        
-        # Add to beginning
-        paths.insert(0, path)
-        
-        # Keep only max_paths
-        paths = paths[:max_paths]
-        
-        data["recent_paths"] = paths
-        self._save_json(self.path_history_file, data)
+        with self._lock:
+            self._refresh(self.path_history_file)
+            max_paths = self._cache[self.path_history_file].get("max_paths", 20)
+            
+            # Move to the most-recent end (O(1) on the underlying hash table)
+            self._recent_paths.pop(path, None)
+            self._recent_paths[path] = None
+            
+            # Keep only max_paths
+            while len(self._recent_paths) > max_paths:
+                self._recent_paths.popitem(last=False)
+            
+            self._mark_dirty(self.path_history_file)
     
     def remove_path_from_history(self, path: str):
         """Remove a path from history"""
-        data = self._load_json(self.path_history_file)
-        paths = data.get("recent_paths", [])
-        
-        if path in paths:
-            paths.remove(path)
-            data["recent_paths"] = paths
-            self._save_json(self.path_history_file, data)
+        with self._lock:
+            self._refresh(self.path_history_file)
+            if path in self._recent_paths:
+                del self._recent_paths[path]
+                self._mark_dirty(self.path_history_file)
     
     def clear_all_data(self):
         """Clear all configuration data"""
-        self._initialize_files()
+        with self._lock:
+            self.flush()
+            self._initialize_files()
+            self._load_all()
         
 # Singleton instance
 config_manager = ConfigManager()
@@ -1,57 +1,20 @@
 import requests
-import json
 import os
+import re
 from datetime import datetime
-try:
-    import tiktoken
-    HAS_TIKTOKEN = True
-except ImportError:
-    HAS_TIKTOKEN = False
-    print("Warning: tiktoken not installed. Token estimation will be approximate.")
+from _tokenizer import get_encoding
+from _json_utils import loads, load_completion, dumps, load_json_object
+from _http_session import make_session
 
-class MoonshotClient:
-    def __init__(self, api_key):
-        self.api_key = api_key
-        self.base_url = "https://api.moonshot.cn/v1/chat/completions"
-        self.headers = {
-            "Authorization": f"Bearer {api_key}",
-            "Content-Type": "application/json"
-        }
-        # Kimi K2 specific settings
-        self.model = "kimi"  # Kimi K2 API model identifier
-        self.temperature = 0.6  # Recommended temperature for Kimi K2
-        self.max_context = 128000  # 128k context window
-        
-        # Initialize tokenizer for estimation
-        self.tokenizer = None
-        if HAS_TIKTOKEN:
-            try:
-                self.tokenizer = tiktoken.get_encoding("cl100k_base")
-            except:
-                self.tokenizer = None
-    
-    def estimate_tokens(self, text):
-        """Estimate token count for text"""
-        if self.tokenizer:
-            return len(self.tokenizer.encode(text))
-        else:
-            # Rough estimation: 1 token ≈ 4 characters
-            return len(text) // 4
-    
-    def send_prd_request(self, prd_content, project_name="MyProject", output_dir="output", max_tokens=None):
-        """Send PRD to Kimi K2 and get code response"""
-        
-        if max_tokens is None:
-            max_tokens = 100000  # Default for Kimi K2
-        
-        # Ensure max_tokens doesn't exceed model limit
-        max_tokens = min(max_tokens, self.max_context - self.estimate_tokens(prd_content) - 1000)
-        
-        prompt = f"""Based on the following PRD (Product Requirements Document), 
+_JSON_BLOCK = re.compile(r'```json\s*([\s\S]*?)\s*```')
+
+# Prompt template around the PRD text (kept constant; joined per request)
+_PROMPT_HEADER = """Based on the following PRD (Product Requirements Document), 
         create a complete, production-ready project with all necessary code files.
         
         PRD Content:
-        {prd_content}
+        """
+_PROMPT_FOOTER = """
         
         Please provide a COMPLETE implementation including:
         1. Full file structure with all directories
@@ -78,19 +41,61 @@ class MoonshotClient:
         If the PRD doesn't specify a project name, use an appropriate name based on the content.
         
         Format your response as JSON with this structure:
-        {{
+        {
             "project_name": "appropriate_project_name_based_on_content",
             "files": [
-                {{
+                {
                     "path": "relative/path/to/file.ext",
                     "content": "complete file content here"
-                }}
+                }
             ]
-        }}
+        }
         """
+
+class MoonshotClient:
+    def __init__(self, api_key):
+        self.api_key = api_key
+        self.base_url = "https://api.moonshot.cn/v1/chat/completions"
+        self.headers = {
+            "Authorization": f"Bearer {api_key}",
+            "Content-Type": "application/json"
+        }
+        
+        # Keep-alive session with retries on transient 429/5xx
+        self.session = make_session(self.headers)
+        
+        # Kimi K2 specific settings
+        self.model = "kimi"  # Kimi K2 API model identifier
+        self.temperature = 0.6  # Recommended temperature for Kimi K2
+        self.max_context = 128000  # 128k context window
+    
+    @property
+    def tokenizer(self):
+        """Shared tokenizer for estimation (None until tiktoken's tables load)"""
+        return get_encoding()
+    
+    def estimate_tokens(self, text):
+        """Estimate token count for text"""
+        tokenizer = self.tokenizer
+        if tokenizer:
+            return len(tokenizer.encode_ordinary(text))
+        else:
+            # Rough estimation: 1 token ≈ 4 characters
+            return len(text) // 4
+    
+    def send_prd_request(self, prd_content, project_name="MyProject", output_dir="output", max_tokens=None):
+        """Send PRD to Kimi K2 and get code response"""
+        
+        if max_tokens is None:
+            max_tokens = 100000  # Default for Kimi K2
         
-        # Estimate input tokens
+        prompt = ''.join((_PROMPT_HEADER, prd_content, _PROMPT_FOOTER))
+        
+        # Estimate input tokens (one tokenizer pass, reused for the clamp)
         input_tokens = self.estimate_tokens(prompt)
+        
+        # Ensure max_tokens doesn't exceed model limit
+        max_tokens = min(max_tokens, self.max_context - input_tokens - 1000)
         print(f"Estimated input tokens: {input_tokens}")
         print(f"Max output tokens: {max_tokens}")
         
@@ -117,16 +122,16 @@ class MoonshotClient:
         
         try:
             print("Sending request to Kimi K2 API...")
-            response = requests.post(
+            response = self.session.post(
                 self.base_url,
-                headers=self.headers,
                 json=payload,
+                stream=True,
                 timeout=120  # 2 minute timeout for large responses
             )
             
             response.raise_for_status()
             
-            result = response.json()
+            result = load_completion(response)
             
             # Extract the content
             if 'choices' in result and len(result['choices']) > 0:
@@ -144,23 +149,19 @@ class MoonshotClient:
                 
                 # Try to extract JSON from the response
                 # Sometimes the model might wrap it in markdown or other text
-                import re
-                
                 # First try to find JSON block in markdown
-                json_match = re.search(r'```json\s*([\s\S]*?)\s*```', content)
-                if json_match:
-                    json_content = json_match.group(1)
-                else:
-                    # Try to find raw JSON
-                    json_match = re.search(r'\{[\s\S]*\}', content)
-                    if json_match:
-                        json_content = json_match.group()
-                    else:
-                        json_content = content
+                json_match = _JSON_BLOCK.search(content)
                 
                 # Validate it's proper JSON
                 try:
-                    json.loads(json_content)
+                    if json_match:
+                        json_content = json_match.group(1)
+                        loads(json_content)
+                    else:
+                        # Try to find raw JSON (parsed as it is located)
+                        json_content, _ = load_json_object(content)
+                        if json_content is None:
+                            raise ValueError("No JSON object in response")
                     return json_content, token_info
                 except:
                     # If not valid JSON, wrap the content in a basic structure
@@ -173,7 +174,7 @@ class MoonshotClient:
                             }
                         ]
                     }
-                    return json.dumps(fallback_response, indent=2), token_info
+                    return dumps(fallback_response), token_info
             else:
                 print("No choices in response")
                 return None, {'actual_input': input_tokens, 'output': 0, 'total': input_tokens}
@@ -183,8 +184,10 @@ class MoonshotClient:
             return None, {'actual_input': input_tokens, 'output': 0, 'total': input_tokens}
         except requests.exceptions.RequestException as e:
             print(f"Request error: {str(e)}")
-            if hasattr(e.response, 'text'):
+            if e.response is not None:
+                # Reading the body and closing returns the streamed connection to the pool
                 print(f"Response text: {e.response.text}")
+                e.response.close()
             return None, {'actual_input': input_tokens, 'output': 0, 'total': input_tokens}
         except Exception as e:
             print(f"Unexpected error: {str(e)}")
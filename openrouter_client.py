@@ -1,13 +1,18 @@
 import requests
 import json
 import os
+import re
 from datetime import datetime
+from _tokenizer import get_encoding
+from _json_utils import loads, load_completion, dumps_bytes
+from _file_writer import write_file, write_project_files
+from _http_session import make_session
+
 try:
-    import tiktoken
-    HAS_TIKTOKEN = True
+    import json_repair
+    HAS_JSON_REPAIR = True
 except ImportError:
-    HAS_TIKTOKEN = False
-    print("Warning: tiktoken not installed. Token estimation will be approximate.")
+    HAS_JSON_REPAIR = False
 
 try:
     from config import MODEL, MAX_TOKENS, TEMPERATURE
@@ -17,40 +22,67 @@ except ImportError:
     MAX_TOKENS = 900000
     TEMPERATURE = 0.7
 
-class OpenRouterClient:
-    def __init__(self, api_key):
-        self.api_key = api_key
-        self.base_url = "https://openrouter.ai/api/v1/chat/completions"
-        self.headers = {
-            "Authorization": f"Bearer {api_key}",
-            "Content-Type": "application/json",
-            "HTTP-Referer": "http://localhost:3000",
-            "X-Title": "PRD Generator"
-        }
-        # Initialize tokenizer for estimation
-        self.tokenizer = None
-        if HAS_TIKTOKEN:
-            try:
-                self.tokenizer = tiktoken.get_encoding("cl100k_base")
-            except:
-                self.tokenizer = None
+# Patterns used to recover JSON from model output (compiled once)
+_JSON_TOKEN = re.compile(r'"(?:[^"\\]|\\.)*("|\Z)|[{}\[\]]', re.DOTALL)
+_TRAILING_COMMA_OBJ = re.compile(r',\s*}')
+_TRAILING_COMMA_ARR = re.compile(r',\s*\]')
+_LEADING_BRACE = re.compile(r'\s*\{')
+_JSON_BLOCK = re.compile(r'```(?:json)?\s*([\s\S]*?)\s*```')
+_NAME_RE = re.compile(r'"project_name"\s*:\s*"([^"]+)"')
+_FILES_RE = re.compile(r'"files"\s*:\s*\[([\s\S]+)\]')
+
+def _apply_fixups(text):
+    """Patch common JSON defects in model output (unclosed strings/brackets, trailing commas)"""
+    # One scan over string literals and brackets; brackets inside complete
+    # strings (common in generated code) are skipped with the literal
+    closers = []
+    open_string = False
+    for m in _JSON_TOKEN.finditer(text):
+        c = text[m.start()]
+        if c == '"':
+            open_string = not m.group(1)
+        elif c == '{':
+            closers.append('}')
+        elif c == '[':
+            closers.append(']')
+        elif closers:
+            closers.pop()
     
-    def estimate_tokens(self, text):
-        """Estimate token count for text"""
-        if self.tokenizer:
-            return len(self.tokenizer.encode(text))
-        else:
-            # Rough estimation: 1 token ≈ 4 characters
-            return len(text) // 4
+    # Close a string cut off by truncation, then any still-open containers
+    if open_string:
+        text += '"'
+    if closers:
+        text += ''.join(reversed(closers))
     
-    def send_prd_request(self, prd_content, project_name="MyProject", output_dir="output", max_tokens=None):
-        """Send PRD to Gemini and get code response"""
-        
-        prompt = f"""Based on the following PRD (Product Requirements Document), 
+    # Remove trailing commas
+    text = _TRAILING_COMMA_OBJ.sub('}', text)
+    text = _TRAILING_COMMA_ARR.sub(']', text)
+    
+    return text
+
+def _repair_loads(text, strict_first=True):
+    """Parse model output as JSON, repairing it only if a strict parse fails"""
+    if strict_first:
+        try:
+            return loads(text)
+        except json.JSONDecodeError:
+            pass
+    
+    # json_repair fixes unclosed strings/brackets and trailing commas in one walk
+    if HAS_JSON_REPAIR:
+        data = json_repair.loads(text)
+        if isinstance(data, dict):
+            return data
+    
+    return loads(_apply_fixups(text))
+
+# Prompt template around the PRD text (kept constant; joined per request)
+_PROMPT_HEADER = """Based on the following PRD (Product Requirements Document), 
         create a complete, production-ready project with all necessary code files.
         
         PRD Content:
-        {prd_content}
+        """
+_PROMPT_FOOTER = """
         
         Please provide a COMPLETE implementation including:
         1. Full file structure with all directories
@@ -76,16 +108,51 @@ class OpenRouterClient:
         If the PRD doesn't specify a project name, use an appropriate name based on the content.
         
         Format your response as JSON with this structure:
-        {{
+        {
             "project_name": "appropriate_project_name_based_on_content",
             "files": [
-                {{
+                {
                     "path": "relative/path/to/file.ext",
                     "content": "complete file content here"
-                }}
+                }
             ]
-        }}
+        }
         """
+
+class OpenRouterClient:
+    def __init__(self, api_key):
+        self.api_key = api_key
+        self.base_url = "https://openrouter.ai/api/v1/chat/completions"
+        self.headers = {
+            "Authorization": f"Bearer {api_key}",
+            "Content-Type": "application/json",
+            "HTTP-Referer": "http://localhost:3000",
+            "X-Title": "PRD Generator"
+        }
+        
+        # Keep-alive session with retries on transient 429/5xx
+        self.session = make_session(self.headers)
+        
+        self.max_context = 2000000  # Gemini 2.5 Pro context window
+    
+    @property
+    def tokenizer(self):
+        """Shared tokenizer for estimation (None until tiktoken's tables load)"""
+        return get_encoding()
+    
+    def estimate_tokens(self, text):
+        """Estimate token count for text"""
+        tokenizer = self.tokenizer
+        if tokenizer:
+            return len(tokenizer.encode_ordinary(text))
+        else:
+            # Rough estimation: 1 token ≈ 4 characters
+            return len(text) // 4
+    
+    def send_prd_request(self, prd_content, project_name="MyProject", output_dir="output", max_tokens=None):
+        """Send PRD to Gemini and get code response"""
+        
+        prompt = ''.join((_PROMPT_HEADER, prd_content, _PROMPT_FOOTER))
         
         # Estimate input tokens
         input_tokens = self.estimate_tokens(prompt)
@@ -103,14 +170,15 @@ class OpenRouterClient:
         }
         
         try:
-            response = requests.post(
+            response = self.session.post(
                 self.base_url,
-                headers=self.headers,
-                json=payload
+                json=payload,
+                stream=True,
+                timeout=(10, None)  # Bound the connect; large generations can take many minutes
             )
             response.raise_for_status()
             
-            result = response.json()
+            result = load_completion(response)
             
             # Extract token usage if available
             usage = result.get('usage', {})
@@ -125,9 +193,12 @@ class OpenRouterClient:
             
         except requests.exceptions.RequestException as e:
             print(f"Error calling API: {e}")
-            if hasattr(e, 'response') and e.response:
+            # An error Response is falsy, so test for None explicitly
+            if e.response is not None:
                 print(f"Response status: {e.response.status_code}")
+                # Reading the body and closing returns the streamed connection to the pool
                 print(f"Response body: {e.response.text}")
+                e.response.close()
             return None, None    
     def save_project_files(self, response_data, output_dir="output", token_info=None):
         """Save the generated code files to disk"""
@@ -143,69 +214,39 @@ class OpenRouterClient:
             # Debug: Save raw content for inspection
             debug_path = os.path.join(output_dir, f"raw_content_{datetime.now().strftime('%Y%m%d_%H%M%S')}.txt")
             os.makedirs(output_dir, exist_ok=True)
-            with open(debug_path, 'w', encoding='utf-8') as f:
-                f.write(content)
+            write_file(debug_path, content)
             print(f"Debug: Raw content saved to {debug_path}")
             
             # Try to parse as JSON
             project_data = None
             
+            # Fast path: well-behaved models return valid JSON as-is, so one
+            # strict parse settles it before any markdown stripping or fixups
+            try:
+                parsed = loads(content)
+                if isinstance(parsed, dict):
+                    project_data = parsed
+                    print("Successfully parsed JSON")
+            except json.JSONDecodeError:
+                pass
+            
             # Method 1: Direct JSON parsing with fixing
-            if content.strip().startswith('{'):
+            if not project_data and _LEADING_BRACE.match(content):
                 try:
-                    # First, try to fix common JSON issues
-                    fixed_content = content
-                    
-                    # Fix unterminated strings by ensuring quotes are closed
-                    fixed_content = re.sub(r'("(?:[^"\\]|\\.)*?)(?<!\\)$', r'\1"', fixed_content, flags=re.MULTILINE)
-                    
-                    # Remove trailing commas
-                    fixed_content = re.sub(r',\s*}', '}', fixed_content)
-                    fixed_content = re.sub(r',\s*\]', ']', fixed_content)
-                    
-                    # Ensure the JSON is properly closed
-                    open_braces = fixed_content.count('{') - fixed_content.count('}')
-                    if open_braces > 0:
-                        fixed_content += '}' * open_braces
-                    
-                    open_brackets = fixed_content.count('[') - fixed_content.count(']')
-                    if open_brackets > 0:
-                        fixed_content += ']' * open_brackets
-                    
-                    project_data = json.loads(fixed_content)
+                    project_data = _repair_loads(content, strict_first=False)
                     print("Successfully parsed JSON (with fixes applied)")
                 except json.JSONDecodeError as e:
                     print(f"Direct JSON parsing failed: {e}")
             
             # Method 2: Extract from markdown code blocks
             if not project_data:
-                import re
                 # Try to find JSON in code blocks
-                json_matches = re.findall(r'```(?:json)?\s*([\s\S]*?)\s*```', content)
+                json_matches = _JSON_BLOCK.findall(content)
                 
                 for match in json_matches:
                     try:
-                        # Apply same fixes to code block content
-                        fixed_match = match
-                        
-                        # Fix unterminated strings
-                        fixed_match = re.sub(r'("(?:[^"\\]|\\.)*?)(?<!\\)$', r'\1"', fixed_match, flags=re.MULTILINE)
-                        
-                        # Remove trailing commas
-                        fixed_match = re.sub(r',\s*}', '}', fixed_match)
-                        fixed_match = re.sub(r',\s*\]', ']', fixed_match)
-                        
-                        # Ensure proper closing
-                        open_braces = fixed_match.count('{') - fixed_match.count('}')
-                        if open_braces > 0:
-                            fixed_match += '}' * open_braces
-                        
-                        open_brackets = fixed_match.count('[') - fixed_match.count(']')
-                        if open_brackets > 0:
-                            fixed_match += ']' * open_brackets
-                        
-                        project_data = json.loads(fixed_match)
-                        print("Successfully extracted JSON from code block (with fixes)")
+                        project_data = _repair_loads(match)
+                        print("Successfully extracted JSON from code block")
                         break
                     except json.JSONDecodeError:
                         continue
@@ -213,16 +254,16 @@ class OpenRouterClient:
             # Method 3: Try to extract just the files array if JSON is partial
             if not project_data:
                 # Look for project name
-                name_match = re.search(r'"project_name"\s*:\s*"([^"]+)"', content)
+                name_match = _NAME_RE.search(content)
                 project_name = name_match.group(1) if name_match else 'generated_project'
                 
                 # Look for files array
-                files_match = re.search(r'"files"\s*:\s*\[([\s\S]+)\]', content)
+                files_match = _FILES_RE.search(content)
                 if files_match:
                     try:
                         # Try to parse just the files array
                         files_content = '[' + files_match.group(1) + ']'
-                        files_array = json.loads(files_content)
+                        files_array = loads(files_content)
                         project_data = {
                             'project_name': project_name,
                             'files': files_array
@@ -240,36 +281,25 @@ class OpenRouterClient:
             project_path = os.path.join(output_dir, project_name)
             os.makedirs(project_path, exist_ok=True)
             
-            # Save each file
-            saved_files = []
-            total_size = 0
-            for file_info in project_data.get('files', []):
-                file_path = os.path.join(project_path, file_info['path'])
-                file_dir = os.path.dirname(file_path)
-                
-                # Create directories if needed
-                os.makedirs(file_dir, exist_ok=True)
-                
-                # Write file
-                with open(file_path, 'w', encoding='utf-8') as f:
-                    f.write(file_info['content'])
-                
-                saved_files.append(file_path)
-                total_size += len(file_info['content'])
+            # Save each file (directories first, then writes in parallel)
+            files = project_data.get('files', [])
+            saved_files = [os.path.join(project_path, p) for p in write_project_files(project_path, files)]
+            total_size = sum(len(file_info['content']) for file_info in files)
+            for file_path in saved_files:
                 print(f"Created: {file_path}")
             
             # Save token usage info if provided
             if token_info:
                 info_path = os.path.join(project_path, '_generation_info.json')
-                with open(info_path, 'w', encoding='utf-8') as f:
-                    json.dump({
+                with open(info_path, 'wb') as f:
+                    f.write(dumps_bytes({
                         'generation_date': datetime.now().isoformat(),
                         'model': MODEL,
                         'token_usage': token_info,
                         'files_created': len(saved_files),
                         'total_size_bytes': total_size,
                         'output_directory': os.path.abspath(project_path)
-                    }, f, indent=2)
+                    }))
             
             print(f"\nProject created successfully at: {os.path.abspath(project_path)}")
             print(f"Total files created: {len(saved_files)}")
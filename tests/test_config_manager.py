@@ -0,0 +1,38 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def _manager_class(tmp_path, monkeypatch):
+    # The module builds its singleton in ./config on import, so import from tmp_path
+    monkeypatch.chdir(tmp_path)
+    from config_manager import ConfigManager
+    return ConfigManager
+
+
+def test_sees_writes_from_another_process(tmp_path, monkeypatch):
+    ConfigManager = _manager_class(tmp_path, monkeypatch)
+    a = ConfigManager(str(tmp_path / "cfg"))
+    b = ConfigManager(str(tmp_path / "cfg"))
+
+    a.save_api_key("moonshot_api_key", "A")
+    a.flush()
+    assert b.get_api_key("moonshot_api_key") == "A"
+
+    # b's write must start from a's change, not overwrite it with a stale dict
+    b.save_api_key("openrouter_api_key", "B")
+    b.flush()
+    assert a.get_api_keys() == {"moonshot_api_key": "A", "openrouter_api_key": "B"}
+
+
+def test_path_history_merges_across_processes(tmp_path, monkeypatch):
+    ConfigManager = _manager_class(tmp_path, monkeypatch)
+    a = ConfigManager(str(tmp_path / "cfg"))
+    b = ConfigManager(str(tmp_path / "cfg"))
+
+    a.add_path_to_history("/x")
+    a.flush()
+    b.add_path_to_history("/y")
+    b.flush()
+    assert a.get_path_history() == ["/y", "/x"]
@@ -0,0 +1,52 @@
+import json
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from _json_utils import load_completion, load_json_object
+
+
+def test_load_json_object_surrounded_by_prose():
+    text, data = load_json_object('Here you go:\n{"a": {"b": "}"}}\nDone.')
+    assert text == '{"a": {"b": "}"}}'
+    assert data == {"a": {"b": "}"}}
+
+
+def test_load_json_object_braces_after_object():
+    text, data = load_json_object('{"a": 1}\nUse it like {this}.')
+    assert text == '{"a": 1}'
+    assert data == {"a": 1}
+
+
+def test_load_json_object_without_object():
+    assert load_json_object("no json here") == (None, None)
+
+
+def test_load_json_object_invalid_object_raises():
+    with pytest.raises(json.JSONDecodeError):
+        load_json_object('{"a": }')
+
+
+class _StreamedResponse:
+    def __init__(self, body):
+        self.body = body
+
+    def iter_content(self, chunk_size):
+        for i in range(0, len(self.body), chunk_size):
+            yield self.body[i:i + chunk_size]
+
+
+@pytest.mark.parametrize("max_size", [1 << 20, 1024])
+def test_load_completion_extracts_content_and_usage(max_size):
+    body = json.dumps({
+        "id": "x",
+        "choices": [{"index": 0, "message": {"role": "assistant", "content": "é" * 50000}}],
+        "usage": {"prompt_tokens": 3, "completion_tokens": 5, "total_tokens": 8},
+    }).encode("utf-8")
+
+    result = load_completion(_StreamedResponse(body), max_size=max_size)
+    assert result["choices"][0]["message"]["content"] == "é" * 50000
+    assert result["usage"]["total_tokens"] == 8
@@ -0,0 +1,43 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from openrouter_client import OpenRouterClient
+
+
+def _response(content):
+    return {'choices': [{'message': {'content': content}}]}
+
+
+def test_save_project_files_valid_json(tmp_path):
+    client = OpenRouterClient("test-key")
+    content = '{"project_name": "p", "files": [{"path": "src/a.txt", "content": "hi"}]}'
+
+    assert client.save_project_files(_response(content), output_dir=str(tmp_path))
+    assert (tmp_path / "p" / "src" / "a.txt").read_text(encoding="utf-8") == "hi"
+
+
+def test_save_project_files_repairs_trailing_comma(tmp_path):
+    client = OpenRouterClient("test-key")
+    content = '{"project_name": "p", "files": [{"path": "a.txt", "content": "hi"},]}'
+
+    assert client.save_project_files(_response(content), output_dir=str(tmp_path))
+    assert (tmp_path / "p" / "a.txt").read_text(encoding="utf-8") == "hi"
+
+
+def test_save_project_files_markdown_block(tmp_path):
+    client = OpenRouterClient("test-key")
+    content = 'Here you go:\n```json\n{"project_name": "p", "files": [{"path": "b.txt", "content": "x"}]}\n```'
+
+    assert client.save_project_files(_response(content), output_dir=str(tmp_path))
+    assert (tmp_path / "p" / "b.txt").read_text(encoding="utf-8") == "x"
+
+
+def test_save_project_files_closes_truncated_output(tmp_path):
+    client = OpenRouterClient("test-key")
+    content = '{"project_name": "p", "files": [{"path": "c.js", "content": "if (x) { y(); }"}, {"path": "d.txt", "content": "cut o'
+
+    assert client.save_project_files(_response(content), output_dir=str(tmp_path))
+    assert (tmp_path / "p" / "c.js").read_text(encoding="utf-8") == "if (x) { y(); }"
+    assert (tmp_path / "p" / "d.txt").read_text(encoding="utf-8") == "cut o"
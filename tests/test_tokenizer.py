@@ -0,0 +1,39 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import _tokenizer
+
+
+class _FlakyTiktoken:
+    """Fails the first load, succeeds afterwards"""
+
+    def __init__(self):
+        self.calls = 0
+
+    def get_encoding(self, name):
+        self.calls += 1
+        if self.calls == 1:
+            raise OSError("network down")
+        return f"encoding:{name}"
+
+
+def test_failed_load_is_retried_not_cached(monkeypatch):
+    fake = _FlakyTiktoken()
+    monkeypatch.setattr(_tokenizer, "HAS_TIKTOKEN", True)
+    monkeypatch.setattr(_tokenizer, "tiktoken", fake, raising=False)
+    monkeypatch.setattr(_tokenizer, "_failed_at", {})
+    _tokenizer._load_encoding.cache_clear()
+
+    assert _tokenizer.get_encoding("test") is None
+    # Within the retry delay nothing is attempted
+    assert _tokenizer.get_encoding("test") is None
+    assert fake.calls == 1
+
+    monkeypatch.setattr(_tokenizer, "RETRY_DELAY", 0.0)
+    assert _tokenizer.get_encoding("test") == "encoding:test"
+    assert _tokenizer.get_encoding("test") == "encoding:test"
+    assert fake.calls == 2
+
+    _tokenizer._load_encoding.cache_clear()